@@ -1,7 +1,147 @@
 import pandas as pd
 import numpy as np
+from pandas.api.types import is_numeric_dtype
 from datetime import datetime
 
+try:
+    from numba import njit, prange
+    NUMBA_AVAILABLE = True
+except ImportError:
+    NUMBA_AVAILABLE = False
+
+try:
+    import numexpr as ne
+    NUMEXPR_AVAILABLE = True
+except ImportError:
+    NUMEXPR_AVAILABLE = False
+
+# Below this many line items the JIT kernel is not worth dispatching to
+NUMBA_MIN_ROWS = 32
+
+# String values treated as missing
+NULL_TOKENS = frozenset(['', 'nan', 'null', 'none', 'None'])
+
+# Columns that must be present on every invoice_df row
+INVOICE_REQUIRED = ('invoice_number', 'invoice_date', 'place_of_supply', 'place_of_origin',
+                    'receiver_name', 'gstin_supplier', 'tax_amount')
+# At least one of these must be present on every invoice_df row
+INVOICE_VALUE_COLS = ('taxable_value', 'invoice_value')
+# Columns taking part in the line_items_df presence rules
+LINE_ITEMS_REQUIRED = ('tax_amount', 'tax_rate', 'sgst_amount', 'cgst_amount', 'igst_amount',
+                       'sgst_rate', 'cgst_rate', 'igst_rate', 'final_amount', 'taxable_value',
+                       'rate_per_item_after_discount', 'quantity')
+# Columns taking part in the total_summary_df presence rules
+SUMMARY_REQUIRED = ('total_taxable_value', 'total_invoice_value', 'total_tax_amount',
+                    'total_igst_amount', 'total_cgst_amount', 'total_sgst_amount')
+
+# Columns that must hold numeric values in each DataFrame
+INVOICE_NUMERIC = ('place_of_supply', 'place_of_origin', 'taxable_value', 'invoice_value', 'tax_amount')
+LINE_ITEMS_NUMERIC = ('quantity', 'rate_per_item_after_discount', 'taxable_value',
+                      'sgst_amount', 'cgst_amount', 'igst_amount', 'sgst_rate',
+                      'cgst_rate', 'igst_rate', 'tax_amount', 'tax_rate', 'final_amount')
+SUMMARY_NUMERIC = ('total_taxable_value', 'total_cgst_amount', 'total_sgst_amount',
+                   'total_igst_amount', 'total_tax_amount', 'total_invoice_value',
+                   'rounding_adjustment')
+
+# Every column each DataFrame is prepared with, in first-seen order
+INVOICE_COLUMNS = tuple(dict.fromkeys(INVOICE_REQUIRED + INVOICE_VALUE_COLS + INVOICE_NUMERIC))
+LINE_ITEMS_COLUMNS = tuple(dict.fromkeys(LINE_ITEMS_REQUIRED + LINE_ITEMS_NUMERIC))
+SUMMARY_COLUMNS = tuple(dict.fromkeys(SUMMARY_REQUIRED + SUMMARY_NUMERIC))
+
+
+def isclose(a, b, rtol=1e-05, atol=1e-08):
+    """
+    Element-wise np.isclose, evaluated in a single fused pass with numexpr when available.
+    NaNs never compare close; infinities only compare close to themselves.
+    """
+    if not NUMEXPR_AVAILABLE:
+        return np.isclose(a, b, rtol=rtol, atol=atol)
+    inf = np.inf
+    return ne.evaluate('(a == b) | ((abs(a - b) <= atol + rtol * abs(b)) & (abs(a - b) < inf))')
+
+
+if NUMBA_AVAILABLE:
+    @njit(cache=True)
+    def _isclose_scalar(a, b):
+        # Scalar np.isclose with its default tolerances (rtol=1e-05, atol=1e-08)
+        if np.isinf(a) or np.isinf(b):
+            return a == b
+        return abs(a - b) <= 1e-08 + 1e-05 * abs(b)
+
+    @njit(cache=True, parallel=True)
+    def _line_item_mismatches_numba(base, sgst_amount, cgst_amount, igst_amount, sgst_rate, cgst_rate,
+                                    igst_rate, tax_amount, tax_rate, final_amount):
+        n = base.shape[0]
+        tax_bad = np.zeros(n, dtype=np.bool_)
+        final_bad = np.zeros(n, dtype=np.bool_)
+        first_tax = np.full(n, np.nan)
+        for i in prange(n):
+            b = base[i]
+            if np.isnan(b):
+                continue
+            taxes = (sgst_amount[i] + cgst_amount[i] + igst_amount[i],
+                     b * (sgst_rate[i] + cgst_rate[i] + igst_rate[i]) / 100,
+                     tax_amount[i],
+                     b * tax_rate[i] / 100)
+            lo = np.inf
+            hi = -np.inf
+            for t in taxes:
+                if np.isnan(t):
+                    continue
+                if np.isnan(first_tax[i]):
+                    first_tax[i] = t
+                lo = min(lo, t)
+                hi = max(hi, t)
+            if np.isnan(first_tax[i]):
+                continue
+            tax_bad[i] = not _isclose_scalar(hi, lo)
+            if not np.isnan(final_amount[i]):
+                final_bad[i] = not _isclose_scalar(final_amount[i], b + first_tax[i])
+        return tax_bad, final_bad, first_tax
+
+
+def line_item_mismatches(base, li):
+    """
+    Compares the available tax calculations of each line item with each other and the
+    final amount with base + tax. Returns (tax_bad, final_bad, tax_amount) arrays, where
+    tax_amount is the first available tax calculation of each row.
+    """
+    if NUMBA_AVAILABLE and len(base) >= NUMBA_MIN_ROWS:
+        return _line_item_mismatches_numba(
+            base, li['sgst_amount'], li['cgst_amount'], li['igst_amount'], li['sgst_rate'],
+            li['cgst_rate'], li['igst_rate'], li['tax_amount'], li['tax_rate'], li['final_amount'])
+    
+    # Different tax amounts, one column per calculation (NaN when not available)
+    taxes = np.stack([
+        li['sgst_amount'] + li['cgst_amount'] + li['igst_amount'],
+        base * (li['sgst_rate'] + li['cgst_rate'] + li['igst_rate']) / 100,
+        li['tax_amount'],
+        base * li['tax_rate'] / 100,
+    ], axis=1)
+    available = ~np.isnan(taxes)
+    
+    # Check if all tax calculations match: the spread between the largest and smallest
+    # available one must be within tolerance (fmax/fmin skip NaNs)
+    hi = np.fmax.reduce(taxes, axis=1)
+    lo = np.fmin.reduce(taxes, axis=1)
+    tax_bad = available.any(axis=1) & ~isclose(hi, lo)
+    
+    # Check final amount against the first available tax calculation
+    tax_amount = taxes[np.arange(len(base)), available.argmax(axis=1)]
+    final = li['final_amount']
+    final_bad = ~np.isnan(final) & ~np.isnan(tax_amount) & ~isclose(final, base + tax_amount)
+    return tax_bad, final_bad, tax_amount
+
+
+def clean_record(record):
+    """
+    Returns a copy of an API record (dict) with null tokens ('', 'nan', 'null', 'none', 'None')
+    replaced by None, so DataFrames built from it need no null standardization.
+    """
+    return {key: None if isinstance(value, str) and value in NULL_TOKENS else value
+            for key, value in record.items()}
+
+
 def validate_invoice_data(invoice_df, line_items_df, total_summary_df):
     """
     Validates the accuracy of invoice data across three dataframes by checking for missing values,
@@ -20,69 +160,78 @@ def validate_invoice_data(invoice_df, line_items_df, total_summary_df):
     --------
     tuple : (bool, str, str)
         (passed, failed_step, failure_details)
+    
+    Null tokens such as '' or 'null' are expected to be converted to None when the
+    DataFrames are built (see clean_record); they are not treated as missing here.
     """
     
-    # Convert all None, blank, empty, etc to NaN for consistency
-    def standardize_nulls(df):
-        # Replace empty strings and string 'nan'/'null' with NaN
-        return df.replace(['', 'nan', 'null', 'none', 'None'], np.nan)
+    # Build presence masks and numeric values once per DataFrame; all three steps reuse them
+    def prepare(df, columns, numeric):
+        # Columns are resolved once; later lookups are plain dict hits on row-contiguous arrays
+        cols = [col for col in columns if col in df.columns]
+        numeric = [col for col in numeric if col in df.columns]
+        present = dict(zip(cols, df[cols].notna().to_numpy().T))
+        converted = df[numeric]
+        # Columns that already have a numeric dtype (e.g. typed at ingest) need no parsing
+        to_parse = [col for col, dtype in converted.dtypes.items() if not is_numeric_dtype(dtype)]
+        if to_parse:
+            converted = converted.assign(**{col: pd.to_numeric(converted[col], errors='coerce') for col in to_parse})
+        values = dict(zip(numeric, converted.to_numpy(dtype=float, na_value=np.nan).T))
+        return present, values
     
-    invoice_df = standardize_nulls(invoice_df)
-    line_items_df = standardize_nulls(line_items_df)
-    total_summary_df = standardize_nulls(total_summary_df)
+    invoice_present, invoice_values = prepare(invoice_df, INVOICE_COLUMNS, INVOICE_NUMERIC)
+    line_items_present, line_items_values = prepare(line_items_df, LINE_ITEMS_COLUMNS, LINE_ITEMS_NUMERIC)
+    summary_present, summary_values = prepare(total_summary_df, SUMMARY_COLUMNS, SUMMARY_NUMERIC)
     
     # Step 1: Check missing values
     def check_missing_values():
-        # Check invoice_df
-        invoice_condition = (
-            invoice_df['invoice_number'].notna() &
-            invoice_df['invoice_date'].notna() &
-            invoice_df['place_of_supply'].notna() &
-            invoice_df['place_of_origin'].notna() &
-            invoice_df['receiver_name'].notna() &
-            invoice_df['gstin_supplier'].notna() &
-            (invoice_df['taxable_value'].notna() | invoice_df['invoice_value'].notna()) &
-            invoice_df['tax_amount'].notna()
+        # Check invoice_df; stops at the first required column with a gap and only then
+        # builds the full mask to report the offending row
+        invoice_complete = (
+            all(invoice_present[col].all() for col in INVOICE_REQUIRED) and
+            np.logical_or.reduce([invoice_present[col] for col in INVOICE_VALUE_COLS]).all()
         )
         
-        if not invoice_condition.all():
-            missing_cols = []
-            row_idx = invoice_condition[~invoice_condition].index[0]
-            for col in invoice_df.columns:
-                if invoice_df[col].isna().iloc[row_idx]:
-                    missing_cols.append(col)
-            return False, f"Missing required values in invoice_df: {', '.join(missing_cols)} at row {row_idx}"
+        if not invoice_complete:
+            invoice_missing = ~np.column_stack([invoice_present[col] for col in INVOICE_REQUIRED])
+            value_missing = ~np.column_stack([invoice_present[col] for col in INVOICE_VALUE_COLS])
+            invoice_bad = invoice_missing.any(axis=1) | value_missing.all(axis=1)
+            i = invoice_bad.argmax()
+            missing_cols = [col for col, flag in zip(INVOICE_REQUIRED, invoice_missing[i]) if flag]
+            if value_missing[i].all():
+                missing_cols.extend(INVOICE_VALUE_COLS)
+            return False, f"Missing required values in invoice_df: {', '.join(missing_cols)} at row {invoice_df.index[i]}"
             
         # Check line_items_df
-        line_items_condition = (
-            ((line_items_df['tax_amount'].notna()) |
-             (line_items_df['tax_rate'].notna()) |
-             (line_items_df['sgst_amount'].notna() & line_items_df['cgst_amount'].notna()) |
-             (line_items_df['igst_amount'].notna()) |
-             (line_items_df['sgst_rate'].notna() & line_items_df['cgst_rate'].notna()) |
-             (line_items_df['igst_rate'].notna())) &
-            (line_items_df['final_amount'].notna() |
-             line_items_df['taxable_value'].notna() |
-             (line_items_df['rate_per_item_after_discount'].notna() & line_items_df['quantity'].notna()))
+        present = line_items_present
+        line_items_bad = ~(
+            (present['tax_amount'] |
+             present['tax_rate'] |
+             (present['sgst_amount'] & present['cgst_amount']) |
+             present['igst_amount'] |
+             (present['sgst_rate'] & present['cgst_rate']) |
+             present['igst_rate']) &
+            (present['final_amount'] |
+             present['taxable_value'] |
+             (present['rate_per_item_after_discount'] & present['quantity']))
         )
         
-        if not line_items_condition.all():
-            row_idx = line_items_condition[~line_items_condition].index[0]
-            return False, f"Missing required values in line_items_df at row {row_idx}"
+        if line_items_bad.any():
+            return False, f"Missing required values in line_items_df at row {line_items_df.index[line_items_bad.argmax()]}"
             
         # Check total_summary_df
-        summary_condition = (
-            (total_summary_df['total_taxable_value'].notna() |
-             total_summary_df['total_invoice_value'].notna()) &
-            (total_summary_df['total_tax_amount'].notna() |
-             total_summary_df['total_igst_amount'].notna() |
-             (total_summary_df['total_cgst_amount'].notna() &
-              total_summary_df['total_sgst_amount'].notna()))
+        present = summary_present
+        summary_bad = ~(
+            (present['total_taxable_value'] |
+             present['total_invoice_value']) &
+            (present['total_tax_amount'] |
+             present['total_igst_amount'] |
+             (present['total_cgst_amount'] &
+              present['total_sgst_amount']))
         )
         
-        if not summary_condition.all():
-            row_idx = summary_condition[~summary_condition].index[0]
-            return False, f"Missing required values in total_summary_df at row {row_idx}"
+        if summary_bad.any():
+            return False, f"Missing required values in total_summary_df at row {total_summary_df.index[summary_bad.argmax()]}"
             
         return True, ""
 
@@ -90,32 +239,20 @@ def validate_invoice_data(invoice_df, line_items_df, total_summary_df):
     def check_data_types():
         try:
             # Check invoice_df date formats
-            invoice_df['invoice_date'] = pd.to_datetime(invoice_df['invoice_date'], format='%d-%b-%Y')
-            
-            # Check numeric columns in invoice_df
-            numeric_cols_invoice = ['place_of_supply', 'place_of_origin', 'taxable_value', 
-                                  'invoice_value', 'tax_amount']
-            for col in numeric_cols_invoice:
-                if not pd.isna(invoice_df[col]).all():
-                    pd.to_numeric(invoice_df[col].dropna())
-            
-            # Check line_items_df numeric columns
-            numeric_cols_items = ['quantity', 'rate_per_item_after_discount', 'taxable_value',
-                                'sgst_amount', 'cgst_amount', 'igst_amount', 'sgst_rate',
-                                'cgst_rate', 'igst_rate', 'tax_amount', 'tax_rate', 'final_amount']
+            pd.to_datetime(invoice_df['invoice_date'], format='%d-%b-%Y')
             
-            for col in numeric_cols_items:
-                if not pd.isna(line_items_df[col]).all():
-                    pd.to_numeric(line_items_df[col].dropna())
-            
-            # Check total_summary_df numeric columns
-            numeric_cols_summary = ['total_taxable_value', 'total_cgst_amount', 'total_sgst_amount',
-                                  'total_igst_amount', 'total_tax_amount', 'total_invoice_value',
-                                  'rounding_adjustment']
-            
-            for col in numeric_cols_summary:
-                if not pd.isna(total_summary_df[col]).all():
-                    pd.to_numeric(total_summary_df[col].dropna())
+            # Values present in the original column but lost by the numeric conversion failed to parse
+            for df_name, df, present, values, cols in (
+                ('invoice_df', invoice_df, invoice_present, invoice_values, INVOICE_NUMERIC),
+                ('line_items_df', line_items_df, line_items_present, line_items_values, LINE_ITEMS_NUMERIC),
+                ('total_summary_df', total_summary_df, summary_present, summary_values, SUMMARY_NUMERIC),
+            ):
+                for col in cols:
+                    failed = present[col] & np.isnan(values[col])
+                    if failed.any():
+                        i = failed.argmax()
+                        return False, (f"Data type conversion failed: Unable to parse string \"{df[col].iat[i]}\" "
+                                       f"in {df_name}.{col} at row {df.index[i]}")
             
             return True, ""
         except Exception as e:
@@ -123,87 +260,47 @@ def validate_invoice_data(invoice_df, line_items_df, total_summary_df):
 
     # Step 3: Check relations
     def check_relations():
-        # Convert numeric columns to float for calculations
-        numeric_cols = {
-            'invoice_df': ['taxable_value', 'invoice_value', 'tax_amount'],
-            'line_items_df': ['rate_per_item_after_discount', 'quantity', 'taxable_value',
-                            'sgst_amount', 'cgst_amount', 'igst_amount', 'sgst_rate',
-                            'cgst_rate', 'igst_rate', 'tax_amount', 'tax_rate', 'final_amount'],
-            'total_summary_df': ['total_taxable_value', 'total_cgst_amount', 'total_sgst_amount',
-                               'total_igst_amount', 'total_tax_amount', 'total_invoice_value',
-                               'rounding_adjustment']
-        }
-        
-        for df_name, cols in numeric_cols.items():
-            df = locals()[df_name]
-            for col in cols:
-                if col in df.columns:
-                    df[col] = pd.to_numeric(df[col], errors='coerce')
-        
         # Check invoice_df relations
-        for idx, row in invoice_df.iterrows():
-            if not pd.isna(row['invoice_value']) and not pd.isna(row['taxable_value']) and not pd.isna(row['tax_amount']):
-                if not np.isclose(row['invoice_value'], row['taxable_value'] + row['tax_amount'], rtol=1e-05):
-                    return False, f"Invoice value mismatch at row {idx}: {row['invoice_value']} != {row['taxable_value']} + {row['tax_amount']}"
+        # After step 2, presence masks of numeric columns coincide with their non-NaN values
+        p = invoice_present
+        iv, tv, ta = invoice_values['invoice_value'], invoice_values['taxable_value'], invoice_values['tax_amount']
+        invoice_bad = p['invoice_value'] & p['taxable_value'] & p['tax_amount'] & ~isclose(iv, tv + ta)
+        if invoice_bad.any():
+            i = invoice_bad.argmax()
+            return False, f"Invoice value mismatch at row {invoice_df.index[i]}: {iv[i]} != {tv[i]} + {ta[i]}"
         
         # Check line_items_df relations
-        for idx, row in line_items_df.iterrows():
-            # Calculate tax variables based on available data
-            if not pd.isna(row['taxable_value']):
-                base_value = row['taxable_value']
-            elif not pd.isna(row['rate_per_item_after_discount']) and not pd.isna(row['quantity']):
-                base_value = row['rate_per_item_after_discount'] * row['quantity']
-            else:
-                continue
-            
-            # Calculate different tax amounts
-            tax_vars = []
-            
-            # From individual amounts
-            if not pd.isna(row['sgst_amount']) and not pd.isna(row['cgst_amount']) and not pd.isna(row['igst_amount']):
-                tax_from_individual_amounts = row['sgst_amount'] + row['cgst_amount'] + row['igst_amount']
-                tax_vars.append(tax_from_individual_amounts)
-            
-            # From individual rates
-            if not pd.isna(row['sgst_rate']) and not pd.isna(row['cgst_rate']) and not pd.isna(row['igst_rate']):
-                tax_from_individual_rates = base_value * (row['sgst_rate'] + row['cgst_rate'] + row['igst_rate']) / 100
-                tax_vars.append(tax_from_individual_rates)
-            
-            # From total tax amount
-            if not pd.isna(row['tax_amount']):
-                tax_vars.append(row['tax_amount'])
-            
-            # From total tax rate
-            if not pd.isna(row['tax_rate']):
-                tax_from_rate = base_value * row['tax_rate'] / 100
-                tax_vars.append(tax_from_rate)
-            
-            # Check if all tax calculations match
-            if len(tax_vars) >= 2:
-                for i in range(len(tax_vars)-1):
-                    if not np.isclose(tax_vars[i], tax_vars[i+1], rtol=1e-05):
-                        return False, f"Tax amount mismatch at row {idx}: Different tax calculations yield different results"
-            
-            # Check final amount
-            if not pd.isna(row['final_amount']):
-                tax_amount = next((t for t in tax_vars if not pd.isna(t)), None)
-                if tax_amount is not None:
-                    if not np.isclose(row['final_amount'], base_value + tax_amount, rtol=1e-05):
-                        return False, f"Final amount mismatch at row {idx}: {row['final_amount']} != {base_value} + {tax_amount}"
+        p, li = line_items_present, line_items_values
+        
+        # Base value from taxable value, falling back to rate * quantity; rows without one are skipped
+        base = np.where(p['taxable_value'], li['taxable_value'],
+                        li['rate_per_item_after_discount'] * li['quantity'])
+        has_base = ~np.isnan(base)
+        
+        tax_bad, final_bad, tax_amount = line_item_mismatches(base, li)
+        final = li['final_amount']
+        
+        line_items_bad = has_base & (tax_bad | final_bad)
+        if line_items_bad.any():
+            i = line_items_bad.argmax()
+            idx = line_items_df.index[i]
+            if tax_bad[i]:
+                return False, f"Tax amount mismatch at row {idx}: Different tax calculations yield different results"
+            return False, f"Final amount mismatch at row {idx}: {final[i]} != {base[i]} + {tax_amount[i]}"
         
         # Check total_summary_df relations
-        for idx, row in total_summary_df.iterrows():
-            # Calculate total tax
-            if pd.isna(row['total_tax_amount']):
-                if not pd.isna(row['total_cgst_amount']) and not pd.isna(row['total_sgst_amount']) and not pd.isna(row['total_igst_amount']):
-                    total_tax = row['total_cgst_amount'] + row['total_sgst_amount'] + row['total_igst_amount']
-            else:
-                total_tax = row['total_tax_amount']
-            
-            # Check invoice total
-            if not pd.isna(row['total_taxable_value']) and not pd.isna(row['total_invoice_value']) and not pd.isna(total_tax):
-                if not np.isclose(row['total_invoice_value'], row['total_taxable_value'] + total_tax, rtol=1e-05):
-                    return False, f"Total invoice value mismatch at row {idx}: {row['total_invoice_value']} != {row['total_taxable_value']} + {total_tax}"
+        p, ts = summary_present, summary_values
+        
+        # Calculate total tax
+        total_tax = np.where(p['total_tax_amount'], ts['total_tax_amount'],
+                             ts['total_cgst_amount'] + ts['total_sgst_amount'] + ts['total_igst_amount'])
+        
+        # Check invoice total
+        ttv, tiv = ts['total_taxable_value'], ts['total_invoice_value']
+        summary_bad = p['total_taxable_value'] & p['total_invoice_value'] & ~np.isnan(total_tax) & ~isclose(tiv, ttv + total_tax)
+        if summary_bad.any():
+            i = summary_bad.argmax()
+            return False, f"Total invoice value mismatch at row {total_summary_df.index[i]}: {tiv[i]} != {ttv[i]} + {total_tax[i]}"
         
         return True, ""
 
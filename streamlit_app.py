@@ -1,35 +1,82 @@
 import streamlit as st
+import hashlib
+from concurrent.futures import ThreadPoolExecutor, as_completed
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 import pandas as pd
 import numpy as np
 from datetime import datetime
-from accuracy_check import validate_invoice_data
-
-def fetch_and_create_dataframes(api_url, payload, uploaded_file):
+from accuracy_check import validate_invoice_data, clean_record, LINE_ITEMS_NUMERIC, SUMMARY_NUMERIC
+
+# (connect, read) timeout in seconds for the extraction API
+REQUEST_TIMEOUT = (5, 120)
+# Concurrent API requests when processing several invoices; matches the session pool size
+MAX_WORKERS = 8
+
+@st.cache_resource
+def get_session():
+    # Shared across script reruns so keep-alive connections are reused between invoices
+    session = requests.Session()
+    session.mount("https://", HTTPAdapter(pool_connections=4, pool_maxsize=MAX_WORKERS,
+                                          max_retries=Retry(total=2, backoff_factor=0.3)))
+    return session
+
+# Nullable numeric dtypes applied to the API response at construction time
+INVOICE_DTYPES = {col: "Float64" for col in ['taxable_value', 'invoice_value', 'tax_amount']}
+LINE_DTYPES = {col: "Float64" for col in LINE_ITEMS_NUMERIC}
+SUMMARY_DTYPES = {col: "Float64" for col in SUMMARY_NUMERIC}
+
+def apply_dtypes(df, dtypes):
+    # Columns that do not convert cleanly are left as-is for validation to report
+    converted = {}
+    for col, dtype in dtypes.items():
+        if col in df.columns:
+            try:
+                converted[col] = df[col].astype(dtype)
+            except (TypeError, ValueError):
+                pass
+    return df.assign(**converted)
+
+def file_digest(pdf_bytes):
+    return hashlib.blake2b(pdf_bytes, digest_size=16).hexdigest()
+
+@st.cache_data(show_spinner=False)
+def process_invoice(api_url, payload, pdf_digest, _pdf_bytes):
+    # Cached per file digest; _pdf_bytes is not hashed. Failures raise, so they are never cached
+    files = {"file": ("invoice.pdf", _pdf_bytes, "application/pdf")}
+    response = get_session().post(api_url, data=payload, files=files, timeout=REQUEST_TIMEOUT)
+
+    if response.status_code != 200:
+        raise requests.HTTPError(f"Failed to fetch data. Status code: {response.status_code}, Error: {response.text}")
+
+    response_json = response.json()
+
+    # Extracting DataFrames; null tokens become None before construction
+    invoice_details = clean_record(response_json.get("Invoice Details", {}))
+    invoice_df = apply_dtypes(pd.json_normalize(invoice_details), INVOICE_DTYPES)
+
+    line_items = [clean_record(item) for item in response_json.get("Line Items", [])]
+    line_items_df = apply_dtypes(pd.json_normalize(line_items), LINE_DTYPES)
+
+    total_summary = clean_record(response_json.get("Total Summary", {}))
+    total_summary_df = apply_dtypes(pd.json_normalize(total_summary), SUMMARY_DTYPES)
+
+    return invoice_df, line_items_df, total_summary_df, response_json
+
+@st.cache_data(show_spinner=False)
+def validate_invoice(pdf_digest, _invoice_df, _line_items_df, _total_summary_df):
+    # The DataFrames are derived from the file, so its digest is enough as a cache key
+    return validate_invoice_data(_invoice_df, _line_items_df, _total_summary_df)
+
+def fetch_and_create_dataframes(api_url, payload, pdf_bytes, pdf_digest):
+    # Runs on worker threads, which cannot render Streamlit elements, so errors are returned
     try:
-        files = {"file": ("invoice.pdf", uploaded_file)}
-        response = requests.post(api_url, data=payload, files=files)
-
-        if response.status_code == 200:
-            response_json = response.json()
-            
-            # Extracting DataFrames
-            invoice_details = response_json.get("Invoice Details", {})
-            invoice_df = pd.DataFrame([invoice_details])
-
-            line_items = response_json.get("Line Items", [])
-            line_items_df = pd.DataFrame(line_items)
-
-            total_summary = response_json.get("Total Summary", {})
-            total_summary_df = pd.DataFrame([total_summary])
-
-            return invoice_df, line_items_df, total_summary_df, response_json
-        else:
-            st.error(f"Failed to fetch data. Status code: {response.status_code}, Error: {response.text}")
-            return None, None, None, None
+        return process_invoice(api_url, payload, pdf_digest, pdf_bytes), None
+    except requests.HTTPError as e:
+        return (None, None, None, None), str(e)
     except Exception as e:
-        st.error(f"An error occurred while fetching data: {e}")
-        return None, None, None, None
+        return (None, None, None, None), f"An error occurred while fetching data: {e}"
 
 # Set page config
 st.set_page_config(page_title="Invoice Processor", layout="wide")
@@ -45,18 +92,36 @@ payload = {
 }
 
 # File uploader
-uploaded_file = st.file_uploader("Choose a PDF file", type=['pdf'])
+uploaded_files = st.file_uploader("Choose PDF files", type=['pdf'], accept_multiple_files=True)
 
-if uploaded_file is not None:
+if uploaded_files:
     # Process button
-    if st.button("Process Invoice"):
-        with st.spinner('Processing invoice...'):
-            # Fetch data and create dataframes
-            invoice_df, line_items_df, total_summary_df, raw_response = fetch_and_create_dataframes(
-                api_url, payload, uploaded_file
-            )
-
-            if invoice_df is not None:
+    if st.button("Process Invoices"):
+        with st.spinner('Processing invoices...'):
+            invoices = []
+            for uploaded_file in uploaded_files:
+                pdf_bytes = uploaded_file.getvalue()
+                invoices.append((uploaded_file.name, pdf_bytes, file_digest(pdf_bytes)))
+
+            # Fetch data and create dataframes; the calls are I/O bound, so threads overlap them
+            unique = {pdf_digest: pdf_bytes for _, pdf_bytes, pdf_digest in invoices}
+            results = {}
+            with ThreadPoolExecutor(max_workers=min(MAX_WORKERS, len(unique))) as executor:
+                futures = {
+                    executor.submit(fetch_and_create_dataframes, api_url, payload, pdf_bytes, pdf_digest): pdf_digest
+                    for pdf_digest, pdf_bytes in unique.items()
+                }
+                for future in as_completed(futures):
+                    results[futures[future]] = future.result()
+
+        for name, _, pdf_digest in invoices:
+            (invoice_df, line_items_df, total_summary_df, raw_response), error = results[pdf_digest]
+
+            with st.expander(name, expanded=len(invoices) == 1):
+                if error is not None:
+                    st.error(error)
+                    continue
+
                 # Create tabs for different views
                 tab1, tab2, tab3, tab4, tab5 = st.tabs([
                     "Raw Response", 
@@ -83,8 +148,8 @@ if uploaded_file is not None:
 
                 with tab5:
                     st.subheader("Validation Results")
-                    validation_results = validate_invoice_data(invoice_df, line_items_df, total_summary_df)
+                    validation_results = validate_invoice(pdf_digest, invoice_df, line_items_df, total_summary_df)
                     st.write(validation_results)
 
 else:
-    st.info("Please upload a PDF invoice to begin processing.")
+    st.info("Please upload PDF invoices to begin processing.")